@@ -29,20 +29,24 @@ def compare(barcode1, seq):
 
 def test_all_versus_all(barcodes):
     '''Test all versus all.'''
+    rev_comps = [str(Seq(barcode).reverse_complement())
+                 for barcode in barcodes]
+
     for idx1, barcode1 in enumerate(barcodes):
         for idx2 in range(idx1 + 1, len(barcodes)):
             compare(barcode1, barcodes[idx2])
-            compare(barcode1, str(Seq(barcodes[idx2]).reverse_complement()))
+            compare(barcode1, rev_comps[idx2])
 
 
 def main(barcodes):
     '''main method.'''
     tols = []
 
-    for _ in range(10000):
-        seq = ''.join([random.choice(['A', 'C', 'G', 'T'])
-                       for _ in range(128)])
+    # Generate all random sequences in a single call:
+    nucls = np.frombuffer(b'ACGT', dtype=np.uint8)
+    seqs = nucls[np.random.randint(0, len(nucls), size=(10000, 128))]
 
+    for seq in seqs.view('S128').ravel().astype(str):
         tols.append(compare(random.choice(barcodes), seq))
 
     print(np.min(tols))
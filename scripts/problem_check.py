@@ -47,9 +47,11 @@ def main(args):
     seqs = seq_utils.read_fasta(args[0]).values()
 
     for seq in seqs:
+        strands = [seq, str(Seq(seq).reverse_complement())]
+
         for barcode in barcodes:
 
-            for s in [seq, str(Seq(seq).reverse_complement())]:
+            for s in strands:
                 seq_len = min(len(barcode) + 48, len(s))
                 seq_start = s[:seq_len]
 
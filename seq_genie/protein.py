@@ -19,7 +19,6 @@ from collections import defaultdict, Counter
 import os
 import sys
 
-from Bio import Seq
 from mpl_toolkits.mplot3d import Axes3D
 # from pysal.explore.inequality import gini
 import pysam
@@ -30,6 +29,7 @@ import multiprocessing as mp
 import numpy as np
 import pandas as pd
 from sbc_ngs import demultiplex, utils
+from seq_genie import utils as sg_utils
 
 
 INDELS_IGNORE = 0
@@ -43,7 +43,7 @@ def align(templ_filename, barcodes_filename, in_dir, out_dir, min_length=1000,
     '''Align sequence files.'''
     barcodes, _ = demultiplex.get_barcodes(barcodes_filename)
 
-    utils.index(templ_filename)
+    sg_utils.get_index(templ_filename)
 
     barcode_reads = demultiplex.demultiplex(barcodes,
                                             in_dir,
@@ -63,22 +63,25 @@ def _align(templ_filename, reads_filename, indels):
     '''Align a single Fasta file.'''
     name, _ = os.path.splitext(reads_filename)
 
-    sam_filename_in = name + '_raw.sam'
-    align_filename = sam_filename_in
+    bam_filename_in = name + '_raw.bam'
+    align_filename = bam_filename_in
 
-    utils.mem(templ_filename, reads_filename,
-              out_filename=sam_filename_in,
-              gap_open=12)
+    sg_utils.mem(templ_filename,
+                 list(pysam.FastxFile(reads_filename, persist=True)),
+                 bam_filename_in,
+                 gap_open=12)
 
     if indels == INDELS_REJECT:
-        sam_filename_out = name + '_indels_reject.sam'
-        align_filename = sam_filename_out
-        utils.reject_indels(sam_filename_in, templ_filename, sam_filename_out)
+        bam_filename_out = name + '_indels_reject.bam'
+        align_filename = bam_filename_out
+        sg_utils.reject_indels(bam_filename_in, templ_filename,
+                               bam_filename_out)
     elif indels == INDELS_REPLACE:
         # Filter indels:
-        sam_filename_out = name + '_indels_replace.sam'
-        align_filename = sam_filename_out
-        utils.replace_indels(sam_filename_in, templ_filename, sam_filename_out)
+        bam_filename_out = name + '_indels_replace.bam'
+        align_filename = bam_filename_out
+        sg_utils.replace_indels(bam_filename_in, templ_filename,
+                                bam_filename_out)
 
     return align_filename
 
@@ -117,40 +120,21 @@ def analyse_aa_mut(sam_files, templ_aa_seq):
                 for _ in range(len(sam_files))]
 
     seqs_to_bins = defaultdict(list)
+    templ_aa = np.frombuffer(str(templ_aa_seq).encode('ascii'), dtype=np.uint8)
 
     for sam_idx, sam_filename in enumerate(sam_files):
         sam_file = pysam.AlignmentFile(sam_filename, 'r')
+        read_aas = sg_utils.translate_reads(sam_file, len(templ_aa))
 
-        for read in sam_file:
-            read_muts, read_aa = \
-                _analyse_aa_mut(read, templ_aa_seq)
-
-            if read_muts is not None:
-                for pos, mut in read_muts.items():
-                    all_muts[sam_idx][pos].append(mut)
+        for row, pos in zip(*np.nonzero(read_aas != templ_aa)):
+            all_muts[sam_idx][pos].append(chr(read_aas[row, pos]))
 
-                seqs_to_bins[read_aa].append(sam_idx + 1)
+        for read_aa in read_aas:
+            seqs_to_bins[read_aa.tobytes().decode('ascii')].append(sam_idx + 1)
 
     return all_muts, seqs_to_bins
 
 
-def _analyse_aa_mut(read, template_aa):
-    '''Analyse amino acid mutations in a single read.'''
-    read_dna = Seq.Seq(read.seq[read.qstart:read.qend])
-    read_aa = read_dna.translate()
-
-    if len(read_aa) == len(template_aa):
-        read_muts = {}
-
-        for (pos, aas) in enumerate(list(zip(read_aa, template_aa))):
-            if aas[0] != aas[1]:
-                read_muts[pos] = aas[0]
-
-        return read_muts, read_aa
-
-    return None, None
-
-
 def plot_stacked(data, filename='stacked.png'):
     '''Plots mutant counts as stacked bar chart.'''
     mut_counts = [[len(pos) for pos in mut] for mut in data]
@@ -10,8 +10,14 @@ from collections import defaultdict
 import os.path
 import sys
 
+from pysam import VariantFile
+
+import numpy as np
 import pandas as pd
-from sbc_ngs import vcf_utils
+
+
+# QS is stored as float32; digits beyond this are widening error:
+_QS_PRECISION = np.finfo(np.float32).precision
 
 
 def analyse(dir_name):
@@ -36,6 +42,7 @@ def analyse(dir_name):
 
             # assert((df[['A', 'C', 'G', 'T']].sum(axis=1) == df['DP']).all())
 
+            df['QS'] = df['QS'].apply(_format_qs)
             df.set_index('POS', inplace=True)
             df.to_csv('_'.join(list(key) + [direction]) + '.csv')
 
@@ -46,29 +53,73 @@ def _get_dfs(dir_name):
 
     count = 0
 
-    for dirpath, _, filenames in os.walk(os.path.abspath(dir_name)):
-        for filename in filenames:
-            if filename.endswith('.vcf'):
-                df, _ = vcf_utils.vcf_to_df(os.path.join(dirpath, filename))
-                name = os.path.basename(
-                    os.path.abspath(os.path.join(dirpath, os.pardir)))
-                tokens = name.split('_')
-                dfs[tuple(tokens[:2])][tokens[2]] = df
+    for filename in _get_vcf_filenames(os.path.abspath(dir_name)):
+        df = _vcf_to_df(filename)
+        name = os.path.basename(
+            os.path.abspath(os.path.join(filename, os.pardir, os.pardir)))
+        tokens = name.split('_')
+        dfs[tuple(tokens[:2])][tokens[2]] = df
 
-                count += 1
+        count += 1
 
-                if count == 3:
-                    return dfs
+        if count == 3:
+            return dfs
 
     return dfs
 
 
+def _get_vcf_filenames(dir_name):
+    '''Get vcf filenames, walking directories top-down with scandir.'''
+    dir_names = [dir_name]
+
+    while dir_names:
+        sub_dir_names = []
+
+        for entry in os.scandir(dir_names.pop()):
+            if entry.is_dir(follow_symlinks=False):
+                sub_dir_names.append(entry.path)
+            elif entry.is_file() and entry.name.endswith('.vcf'):
+                yield entry.path
+
+        dir_names.extend(reversed(sub_dir_names))
+
+
+def _vcf_to_df(vcf_filename):
+    '''Convert vcf to DataFrame.'''
+    vcf_file = VariantFile(vcf_filename)
+
+    df = pd.DataFrame([{'POS': rec.pos,
+                        'REF': rec.ref,
+                        'ALT': ','.join(rec.alts or ()),
+                        'DP': rec.info.get('DP', 0),
+                        'QS': tuple(rec.info.get('QS', ())),
+                        'INDEL': 'INDEL' in rec.info}
+                       for rec in vcf_file],
+                      columns=['POS', 'REF', 'ALT', 'DP', 'QS', 'INDEL'])
+
+    vcf_file.close()
+
+    return df
+
+
+def _format_qs(qs):
+    '''Format QS as written by bcftools.'''
+    return ','.join(['%g' % round(prop, _QS_PRECISION) for prop in qs])
+
+
 def _get_nucl_count(row):
     '''Get nucleotide count.'''
     counts = {nucl: 0 for nucl in 'ACGT'}
+
+    # No QS (e.g. DP=0), so no reads to count:
+    if not row['QS']:
+        return list(counts.values())
+
     nucls = (row['REF'] + ',' + row['ALT']).split(',')
-    proportions = [round(float(prop) * row['DP'])
-                   for prop in row['QS'].split(',')]
+
+    # Round off float32 widening (0.95 -> 0.949999988) before scaling:
+    proportions = [round(round(prop, _QS_PRECISION) * row['DP'])
+                   for prop in row['QS']]
     counts.update(dict(zip(nucls, proportions)))
     counts.pop('<*>', None)
     return list(counts.values())
@@ -0,0 +1,7 @@
+'''
+SequenceGenie (c) University of Manchester 2019
+
+All rights reserved.
+
+@author: neilswainston
+'''
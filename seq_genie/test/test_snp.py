@@ -0,0 +1,62 @@
+'''
+SequenceGenie (c) University of Manchester 2019
+
+All rights reserved.
+
+@author: neilswainston
+'''
+# pylint: disable=protected-access
+import os
+import shutil
+import tempfile
+import unittest
+
+from seq_genie import snp
+
+
+_VCF = '''##fileformat=VCFv4.2
+##contig=<ID=templ,length=100>
+##INFO=<ID=INDEL,Number=0,Type=Flag,Description="Indel">
+##INFO=<ID=DP,Number=1,Type=Integer,Description="Depth">
+##INFO=<ID=QS,Number=R,Type=Float,Description="Quality proportions">
+#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO
+templ\t1\t.\tA\tC,<*>\t0\t.\tDP=10;QS=0.95,0.05,0
+templ\t2\t.\tG\t<*>\t0\t.\tDP=0
+'''
+
+
+class Test(unittest.TestCase):
+    '''Test class for snp.'''
+
+    def setUp(self):
+        self.__dir = tempfile.mkdtemp()
+        self.__filename = os.path.join(self.__dir, 'test.vcf')
+
+        with open(self.__filename, 'w') as fle:
+            fle.write(_VCF)
+
+    def tearDown(self):
+        shutil.rmtree(self.__dir)
+
+    def test_get_nucl_count(self):
+        '''Tests _get_nucl_count is not skewed by float32 QS values.'''
+        df = snp._vcf_to_df(self.__filename)
+
+        self.assertEqual(snp._get_nucl_count(df.iloc[0]), [10, 0, 0, 0])
+
+    def test_get_nucl_count_no_qs(self):
+        '''Tests _get_nucl_count of record without QS.'''
+        df = snp._vcf_to_df(self.__filename)
+
+        self.assertEqual(df.iloc[1]['QS'], ())
+        self.assertEqual(snp._get_nucl_count(df.iloc[1]), [0, 0, 0, 0])
+
+    def test_format_qs(self):
+        '''Tests _format_qs recovers the QS text written by bcftools.'''
+        df = snp._vcf_to_df(self.__filename)
+
+        self.assertEqual(snp._format_qs(df.iloc[0]['QS']), '0.95,0.05,0')
+
+
+if __name__ == '__main__':
+    unittest.main()
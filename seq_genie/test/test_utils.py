@@ -0,0 +1,217 @@
+'''
+SequenceGenie (c) University of Manchester 2019
+
+All rights reserved.
+
+@author: neilswainston
+'''
+# pylint: disable=protected-access
+import itertools
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from Bio import Seq
+import pysam
+
+from seq_genie import utils
+
+
+class Test(unittest.TestCase):
+    '''Test class for utils.'''
+
+    def setUp(self):
+        self.__dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.__dir)
+
+    def test_replace_indels(self):
+        '''Tests mem then replace_indels gives full-length alignments.'''
+        templ_seq = _get_random_seq(600)
+        templ_filename = os.path.join(self.__dir, 'templ.fasta')
+
+        with open(templ_filename, 'w') as fle:
+            fle.write('>templ\n' + templ_seq + '\n')
+
+        queries = []
+
+        for idx in range(20):
+            seq = list(templ_seq)
+            del seq[random.randrange(100, 500)]
+            seq.insert(random.randrange(100, 500), 'A')
+            queries.append(pysam.FastxRecord(name='read_%i' % idx,
+                                             sequence=''.join(seq)))
+
+        raw_filename = os.path.join(self.__dir, 'raw.bam')
+        out_filename = os.path.join(self.__dir, 'replace.bam')
+
+        utils.mem(templ_filename, queries, raw_filename)
+        utils.replace_indels(raw_filename, templ_filename, out_filename)
+
+        reads = list(pysam.AlignmentFile(out_filename, 'r'))
+
+        self.assertEqual(len(reads), len(queries))
+
+        for read in reads:
+            self.assertEqual(read.cigartuples,
+                             [(pysam.CMATCH, len(templ_seq))])
+
+    def test_strip(self):
+        '''Tests _strip against per-pair reconstruction.'''
+        templ_seq = _get_random_seq(300)
+        templ_arr = utils._seq_to_arr(templ_seq)
+
+        for read in _get_reads(templ_seq, 200):
+            self.assertEqual(utils._strip(read, templ_arr),
+                             _strip(read, templ_seq))
+
+    def test_strip_no_numba(self):
+        '''Tests numpy fallback of _strip against per-pair reconstruction.'''
+        templ_seq = _get_random_seq(300)
+        templ_arr = utils._seq_to_arr(templ_seq)
+
+        with mock.patch.object(utils, 'njit', None):
+            for read in _get_reads(templ_seq, 200):
+                self.assertEqual(utils._strip(read, templ_arr),
+                                 _strip(read, templ_seq))
+
+    def test_translate(self):
+        '''Tests translate against Seq.translate for all IUPAC codons.'''
+        for codon in itertools.product('ACGTRYSWKMBDHVNacgtn', repeat=3):
+            codon = ''.join(codon)
+            self.assertEqual(_translate(codon),
+                             str(Seq.Seq(codon).translate()))
+
+    def test_translate_seq(self):
+        '''Tests translate of sequences, trimming partial codons.'''
+        for length in range(64):
+            seq = ''.join([random.choice('ACGTN') for _ in range(length)])
+            self.assertEqual(_translate(seq),
+                             str(Seq.Seq(seq[:length // 3 * 3]).translate()))
+
+    def test_translate_reads(self):
+        '''Tests translate_reads against per-read translation.'''
+        templ_seq = _get_random_seq(90)
+        filename = self.__write_reads(templ_seq)
+        aa_len = len(templ_seq) // 3
+
+        read_aas = utils.translate_reads(pysam.AlignmentFile(filename, 'r'),
+                                         aa_len)
+
+        self.assertEqual(read_aas.shape[1], aa_len)
+        self.assertEqual([read_aa.tobytes().decode('ascii')
+                          for read_aa in read_aas],
+                         _translate_reads(filename, aa_len))
+
+    def test_strip_unmapped(self):
+        '''Tests _strip of unmapped read.'''
+        header = pysam.AlignmentHeader.from_dict(
+            {'SQ': [{'SN': 'templ', 'LN': 300}]})
+        read = pysam.AlignedSegment(header)
+        read.query_sequence = _get_random_seq(50)
+
+        self.assertEqual(utils._strip(read, utils._seq_to_arr('')), '')
+
+
+    def __write_reads(self, templ_seq):
+        '''Write reads of varying aligned length, with substitutions.'''
+        filename = os.path.join(self.__dir, 'reads.bam')
+        header = pysam.AlignmentHeader.from_dict(
+            {'SQ': [{'SN': 'templ', 'LN': len(templ_seq)}]})
+
+        with pysam.AlignmentFile(filename, 'wb', header=header) as out_file:
+            for idx in range(200):
+                seq = list(templ_seq + 'AC')
+
+                for _ in range(3):
+                    seq[random.randrange(len(templ_seq))] = \
+                        random.choice('ACGTN')
+
+                aln_len = random.choice([60, 89, 90, 90, 91, 92])
+
+                read = pysam.AlignedSegment(header)
+                read.query_name = 'read_%i' % idx
+                read.reference_id = 0
+                read.reference_start = 0
+                read.query_sequence = 'GG' + ''.join(seq[:aln_len]) + 'TT'
+                read.cigartuples = [(pysam.CSOFT_CLIP, 2),
+                                    (pysam.CMATCH, aln_len),
+                                    (pysam.CSOFT_CLIP, 2)]
+                out_file.write(read)
+
+        return filename
+
+
+def _translate(seq):
+    '''Translate with utils.translate, as a string.'''
+    return utils.translate(seq).tobytes().decode('ascii')
+
+
+def _translate_reads(filename, aa_len):
+    '''Reference per-read implementation of utils.translate_reads.'''
+    read_aas = []
+
+    for read in pysam.AlignmentFile(filename, 'r'):
+        nucl_seq = read.seq[read.qstart:read.qend]
+        read_aa = str(Seq.Seq(nucl_seq[:len(nucl_seq) // 3 * 3]).translate())
+
+        if len(read_aa) == aa_len:
+            read_aas.append(read_aa)
+
+    return read_aas
+
+
+def _strip(read, templ_seq):
+    '''Reference per-pair implementation of utils._strip.'''
+    return ''.join([read.seq[pair[0]]
+                    if pair[0] is not None
+                    else templ_seq[pair[1]]
+                    for pair in read.aligned_pairs
+                    if pair[1] is not None])
+
+
+def _get_reads(templ_seq, num):
+    '''Get random reads with clips, insertions and deletions.'''
+    header = pysam.AlignmentHeader.from_dict(
+        {'SQ': [{'SN': 'templ', 'LN': len(templ_seq)}]})
+    reads = []
+
+    for idx in range(num):
+        cigar = [(pysam.CSOFT_CLIP, random.randint(1, 3))] \
+            if random.random() < 0.5 else []
+        cigar.append((pysam.CMATCH, random.randint(1, 5)))
+
+        for _ in range(random.randint(0, 10)):
+            cigar.append((random.choice([pysam.CMATCH, pysam.CINS,
+                                         pysam.CDEL]),
+                          random.randint(1, 4)))
+
+        cigar.append((pysam.CMATCH, random.randint(1, 5)))
+
+        if random.random() < 0.5:
+            cigar.append((pysam.CSOFT_CLIP, 2))
+
+        read = pysam.AlignedSegment(header)
+        read.query_name = 'read_%i' % idx
+        read.reference_id = 0
+        read.reference_start = random.randint(0, 100)
+        read.cigartuples = cigar
+        read.query_sequence = _get_random_seq(
+            sum(length for op, length in cigar
+                if op in [pysam.CMATCH, pysam.CINS, pysam.CSOFT_CLIP]))
+        reads.append(read)
+
+    return reads
+
+
+def _get_random_seq(length):
+    '''Get random nucleotide sequence.'''
+    return ''.join([random.choice('ACGT') for _ in range(length)])
+
+
+if __name__ == '__main__':
+    unittest.main()
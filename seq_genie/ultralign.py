@@ -16,10 +16,11 @@ import multiprocessing
 import sys
 import time
 
-from Bio import pairwise2, SeqIO, Seq
+from Bio import pairwise2, Seq
 from synbiochem.utils import mut_utils, seq_utils
 
 import numpy as np
+import pyfastx
 
 
 _NUCL_IDX = {'A': 0, 'C': 1, 'G': 2, 'T': 3}
@@ -38,14 +39,13 @@ class Aligner():
         self.__wt_prob = wt_prob
 
         # Read template sequence:
-        with open(wt_filename, 'rU') as fle:
-            for record in SeqIO.parse(fle, 'fasta'):
-                self.__wt_seq = str(record.seq)
+        for _, seq in pyfastx.Fasta(wt_filename, build_index=False):
+            self.__wt_seq = seq
 
         # Read sequences:
-        with open(seqs_filename, 'rU') as fle:
-            self.__seqs = [[record.id, str(record.seq)]
-                           for record in SeqIO.parse(fle, 'fasta')]
+        self.__seqs = [[seq_id, seq]
+                       for seq_id, seq in pyfastx.Fasta(seqs_filename,
+                                                        build_index=False)]
 
         self.__nucl_probs = _get_nucl_probs()
         self.__pos_spec_probs = self.__get_pos_spec_probs(mut_strs)
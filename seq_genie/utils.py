@@ -6,18 +6,71 @@ All rights reserved.
 @author: neilswainston
 '''
 # pylint: disable=no-name-in-module
-from Bio import Seq, SeqIO, SeqRecord
+import itertools
+import multiprocessing
+import os.path
+
+from Bio import SeqIO
+from Bio.Data import CodonTable
+from pybwa import BwaIndex, BwaMem, BwaMemMode, BwaMemOptions
+from pysam import CMATCH, FastxRecord, Samfile, samtools
 from synbiochem.utils import io_utils
-from sbc_ngs import utils
 
+import numpy as np
 
-def reject_indels(sam_filename_in, templ_filename, sam_filename_out):
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+_NUCLS = 'ACGTRYSWKMBDHVN'
+
+
+def _get_nucl_idx():
+    '''Gets IUPAC nucleotide index lookup by ASCII code (15 if invalid).'''
+    nucl_idx = np.full(256, len(_NUCLS), dtype=np.uint16)
+
+    for idx, nucl in enumerate(_NUCLS):
+        nucl_idx[ord(nucl)] = idx
+        nucl_idx[ord(nucl.lower())] = idx
+
+    return nucl_idx
+
+
+def _get_codons():
+    '''Gets amino acid lookup by base-16 encoded codon, as Seq.translate.'''
+    table = CodonTable.ambiguous_dna_by_id[1]
+    codons = np.full(16 ** 3, ord('X'), dtype=np.uint8)
+
+    for codon in itertools.product(_NUCLS, repeat=3):
+        codon = ''.join(codon)
+
+        if codon in table.stop_codons:
+            aa = '*'
+        else:
+            try:
+                aa = table.forward_table[codon]
+            except (KeyError, CodonTable.TranslationError):
+                aa = 'X'
+
+        idx = [_NUCL_IDX[ord(nucl)] for nucl in codon]
+        codons[idx[0] * 256 + idx[1] * 16 + idx[2]] = ord(aa)
+
+    return codons
+
+
+_NUCL_IDX = _get_nucl_idx()
+_CODONS = _get_codons()
+
+
+def reject_indels(sam_filename_in, templ_filename, bam_filename_out):
     '''Rejects indels.'''
     sam_file = Samfile(sam_filename_in, 'r')
-    out_file = Samfile(sam_filename_out, 'wh',
+    out_file = Samfile(bam_filename_out, 'wb',
                        template=sam_file,
                        header=sam_file.header)
-    templ_seq = get_seq(templ_filename)
+    templ_match = (CMATCH, len(get_seq(templ_filename)))
 
     all_reads = 0
     passed_reads = 0
@@ -25,7 +78,7 @@ def reject_indels(sam_filename_in, templ_filename, sam_filename_out):
     for read in sam_file:
         all_reads += 1
 
-        if read.cigarstring and str(len(templ_seq)) + 'M' in read.cigarstring:
+        if read.cigartuples and templ_match in read.cigartuples:
             out_file.write(read)
             passed_reads += 1
 
@@ -36,11 +89,12 @@ def reject_indels(sam_filename_in, templ_filename, sam_filename_out):
     out_file.close()
 
 
-def replace_indels(sam_filename_in, templ_filename, sam_filename_out):
+def replace_indels(sam_filename_in, templ_filename, bam_filename_out):
     '''Replace indels, replacing them with wildtype.'''
-    sam_filename_out = io_utils.get_filename(sam_filename_out)
+    bam_filename_out = io_utils.get_filename(bam_filename_out)
     templ_seq = get_seq(templ_filename)
-    records = []
+    templ_arr = _seq_to_arr(str(templ_seq))
+    queries = []
 
     all_reads = 0
 
@@ -48,30 +102,124 @@ def replace_indels(sam_filename_in, templ_filename, sam_filename_out):
         # Perform mapping of nucl indices to remove spurious indels:
         all_reads += 1
 
-        seq = ''.join([read.seq[pair[0]]
-                       if pair[0]
-                       else templ_seq[pair[1]]
-                       for pair in read.aligned_pairs
-                       if pair[1] is not None])
+        seq = _strip(read, templ_arr)
 
         if seq:
-            records.append(SeqRecord.SeqRecord(Seq.Seq(seq), read.qname,
-                                               '', ''))
+            queries.append(FastxRecord(name=read.qname, sequence=seq))
 
-    reads_filename = io_utils.get_filename(None)
-
-    with open(reads_filename, 'w') as fle:
-        SeqIO.write(records, fle, 'fasta')
-
-    utils.mem(templ_filename, reads_filename,
-              out_filename=sam_filename_out,
-              gap_open=12)
+    mem(templ_filename, queries, bam_filename_out, gap_open=12)
 
     print('%s: %i/%i passed replace_indels filter' % (sam_filename_in,
-                                                      len(records),
+                                                      len(queries),
                                                       all_reads))
 
-    return sam_filename_out
+    return bam_filename_out
+
+
+def mem(templ_filename, queries, bam_filename_out, gap_open=12):
+    '''Align FastxRecord queries in-process with bwa mem, writing BAM.'''
+    index = get_index(templ_filename)
+    out_file = Samfile(bam_filename_out, 'wb', header=index.header)
+
+    for alignments in BwaMem(index=index).align(queries,
+                                                 _get_mem_options(gap_open)):
+        for alignment in alignments:
+            out_file.write(alignment)
+
+    out_file.close()
+
+
+def get_index(templ_filename):
+    '''Get bwa index, building index and sequence dictionary if missing.'''
+    if not all(os.path.exists(templ_filename + ext)
+               for ext in ['.amb', '.ann', '.bwt', '.pac', '.sa']):
+        # Also builds the sequence dictionary:
+        BwaIndex.index(templ_filename)
+
+    dict_filename = os.path.splitext(templ_filename)[0] + '.dict'
+
+    if not os.path.exists(dict_filename):
+        samtools.dict('-o', dict_filename, templ_filename)
+
+    return BwaIndex(templ_filename)
+
+
+def _get_mem_options(gap_open):
+    '''Get options equivalent to bwa mem -x ont2d -O gap_open.'''
+    # pybwa does not apply the mode preset itself, so set it explicitly:
+    return BwaMemOptions(mode=BwaMemMode.ONT2D,
+                         min_seed_len=14,
+                         min_seeded_bases_in_chain=20,
+                         internal_seed_split_factor=10,
+                         match_score=1,
+                         mismatch_penalty=1,
+                         gap_open_penalty=gap_open,
+                         gap_extension_penalty=1,
+                         clipping_penalty=0,
+                         threads=multiprocessing.cpu_count())
+
+
+def _strip(read, templ_arr):
+    '''Strip insertions from read, replacing deletions with wildtype.'''
+    pairs = read.get_aligned_pairs(matches_only=True)
+
+    if not pairs:
+        return ''
+
+    pairs = np.array(pairs, dtype=np.int32)
+
+    # Reference positions without a matched read base are deletions (-1):
+    r_idx = np.arange(read.reference_start, read.reference_end,
+                      dtype=np.int32)
+    q_idx = np.full(len(r_idx), -1, dtype=np.int32)
+    q_idx[pairs[:, 1] - read.reference_start] = pairs[:, 0]
+    qseq = _seq_to_arr(read.seq)
+
+    if njit is None:
+        # Select read or template bases with a single mask:
+        out = np.where(q_idx >= 0, qseq[q_idx], templ_arr[r_idx])
+        return out.astype(np.uint8).tobytes().decode('ascii')
+
+    out = np.empty(len(r_idx), dtype=np.uint8)
+    _strip_core(q_idx, r_idx, qseq, templ_arr, out)
+
+    return out.tobytes().decode('ascii')
+
+
+def _strip_core(q_idx, r_idx, qseq, tseq, out):
+    '''Write read (or template, at deletions) bases to out.'''
+    for idx in range(len(q_idx)):
+        if q_idx[idx] < 0:
+            out[idx] = tseq[r_idx[idx]]
+        else:
+            out[idx] = qseq[q_idx[idx]]
+
+
+if njit is not None:
+    _strip_core = njit(cache=True)(_strip_core)
+
+
+def _seq_to_arr(seq):
+    '''Get sequence as numpy array of ASCII codes.'''
+    return np.frombuffer(seq.encode('ascii'), dtype=np.uint8)
+
+
+def translate_reads(sam_file, aa_len):
+    '''Translate reads spanning aa_len codons, as an (reads, aa_len) array.'''
+    nucl_len = aa_len * 3
+
+    seqs = [read.seq[read.qstart:read.qstart + nucl_len]
+            for read in sam_file
+            if (read.qend - read.qstart) // 3 == aa_len]
+
+    return translate(''.join(seqs)).reshape(len(seqs), aa_len)
+
+
+def translate(nucl_seq):
+    '''Translate nucleotide sequence by codon lookup, as ASCII codes.'''
+    nucls = _NUCL_IDX[np.frombuffer(nucl_seq.encode('ascii'), dtype=np.uint8)]
+    nucls = nucls[:len(nucls) // 3 * 3].reshape(-1, 3)
+    return _CODONS[nucls[:, 0] * 256 + nucls[:, 1] * 16 + nucls[:, 2]]
 
 
 def get_seq(filename):